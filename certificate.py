@@ -3,7 +3,9 @@ from __future__ import annotations
 import logging
 import socket
 import ssl as tls
+import time
 from cryptography import x509
+from cryptography.hazmat.primitives import hashes
 from urllib.parse import urlparse
 from datetime import datetime, UTC, timedelta
 from os.path import join as path_join
@@ -39,17 +41,19 @@ default_ports = {
 
 
 class Certificate:
-    def __init__(self, location: str, config: configuration.Configuration, logger: logging.Logger,
-                 config_location: str = None):
+    def __init__(self, entry: configuration.Location, logger: logging.Logger):
         self.expiry: timedelta = None
         self.logger: logging.Logger = logger
-        self.mode: str = config.get('poll-mode', config_location)
-        self.max_age: int = config.get('max-age', config_location)
-        self.msg_template: str = config.get('message-template', config_location)
-        self.logger.debug(f'mode: {self.mode}, max-age: {self.max_age}, config_location: {config_location}')
-        self.location: str = location
-        self.config = config
+        self.mode: str = entry.poll_mode
+        self.max_age: int = entry.max_age
+        self.msg_template: str = entry.message_template
+        self.cert_file: str = entry.cert_file
+        self.logger.debug(f'mode: {self.mode}, max-age: {self.max_age}, config_location: {entry.section}')
+        self.entry: configuration.Location = entry
+        self.location: str = entry.location
         self.data = None
+        self.latency: float = None
+        self.error: str = None
 
     def __eq__(self, other: Certificate):
         if self.data is None or other.data is None:
@@ -69,19 +73,23 @@ class Certificate:
         if self.data is not None:
             return
 
-        elif self.mode == 'files':
-            self.location = path_join(self.location, self.config.get('cert-file'))
-            self.get_cert_files()
+        start = time.perf_counter()
+        try:
+            if self.mode == 'files':
+                self.location = path_join(self.location, self.cert_file)
+                self.get_cert_files()
 
-        elif self.mode == 'host':
-            self.ctx = tls.create_default_context()
-            self.ctx.check_hostname = False
-            self.ctx.verify_mode = tls.CERT_NONE
+            elif self.mode == 'host':
+                self.ctx = tls.create_default_context()
+                self.ctx.check_hostname = False
+                self.ctx.verify_mode = tls.CERT_NONE
 
-            self.host, self.port = self.parse_uri(self.location)
-            self.get_cert_host()
+                self.host, self.port = self.parse_uri(self.location)
+                self.get_cert_host()
 
-        self.data = x509.load_pem_x509_certificate(str.encode(self.cert))
+            self.data = x509.load_pem_x509_certificate(str.encode(self.cert))
+        finally:
+            self.latency = time.perf_counter() - start
 
     ##
     # Returns content of specified cert file
@@ -118,6 +126,12 @@ class Certificate:
     def get_hosts(self):
         return self.data.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
 
+    ##
+    # Returns the SHA-256 fingerprint of the certificate in hex
+    ##
+    def fingerprint(self) -> str:
+        return self.data.fingerprint(hashes.SHA256()).hex()
+
     ##
     # Returns if timedelta until (or from) expiry
     ##
@@ -1,13 +1,19 @@
 import datetime
 import logging
 import os
+import sqlite3
 import sys
+import typing
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 
-from configuration import Configuration
+from configuration import Configuration, Location
 from certificate import Certificate
+from history import History
 from notification.channel import NotificationChannel
+from notification.jsonlog import ChannelJson
 from notification.mail import ChannelMail
+from notification.registry import CertificateRegistry
 from notification.script import ChannelScript
 
 
@@ -33,53 +39,92 @@ class Main:
         self.config: Configuration = Configuration(config, self.logger)
         self.config.read_config()
 
-        self.notifier: NotificationChannel = None
+        self.registry: CertificateRegistry = CertificateRegistry(self.logger, self.config.get('max-workers'))
+        self.polling: bool = False
+        self.notifiers: typing.List[NotificationChannel] = []
 
     def setup_channel(self, polling_mode = False):
-        if polling_mode:
-            self.notifier: NotificationChannel = ChannelScript(self.logger)
-        elif self.config.get('mail-enable'):
-            self.notifier: NotificationChannel = ChannelMail(logger= self.logger,
-                                                             smtp_server=self.config.get('smtp-server'),
-                                                             smtp_port=self.config.get('smtp-port'),
-                                                             smtp_security=self.config.get('smtp-security'),
-                                                             smtp_user=self.config.get('smtp-user'),
-                                                             smtp_password=self.config.get('smtp-password'),
-                                                             sender=self.config.get('sender'),
-                                                             receiver=self.config.get('receiver'))
-
-    def get_certificate(self, location: str, config_location: str = None):
-        self.logger.info(f'Processing location: {location}')
-        cert = Certificate(location, self.config, self.logger, config_location)
-        self.notifier.register_certificate(cert)
-
-        if self.config.get('auto-load-certs'):
-            cert.load_cert_data()
+        self.polling = bool(polling_mode)
+        if self.polling:
+            self.notifiers.append(ChannelScript(self.logger, self.registry))
+            return
+
+        if self.config.get('mail-enable'):
+            self.notifiers.append(ChannelMail(logger=self.logger,
+                                              registry=self.registry,
+                                              smtp_server=self.config.get('smtp-server'),
+                                              smtp_port=self.config.get('smtp-port'),
+                                              smtp_security=self.config.get('smtp-security'),
+                                              smtp_user=self.config.get('smtp-user'),
+                                              smtp_password=self.config.get('smtp-password'),
+                                              sender=self.config.get('sender'),
+                                              receiver=self.config.get('receiver')))
+
+        if self.config.get('json-enable'):
+            self.notifiers.append(ChannelJson(logger=self.logger,
+                                              registry=self.registry,
+                                              json_file=self.config.get('json-file')))
+
+    def get_certificate(self, entry: Location):
+        self.logger.info(f'Processing location: {entry.location}')
+        cert = Certificate(entry, self.logger)
+        self.registry.register_certificate(cert)
 
     def process_certificates(self):
 
-        if ((self.config.get('locations')[0] == '' and len(self.config.get('locations')) == 1)
-                or len(self.config.get('locations')) == 0):
-            self.logger.error('No locations configured')
+        if not self.config.validate():
             sys.exit(1)
 
-        for location in self.config.get('locations'):
-
-            if location.startswith('section:'):
-                location = location.replace('section:', '')
-
-                if self.config.get('locations', location) is None:
-                    self.logger.error(f"No location specified for [{location}]")
-                    sys.exit(1)
-
-                for sub_location in self.config.get('locations', location):
-                    self.get_certificate(location=sub_location, config_location=location)
-
-            else:
-                self.get_certificate(location=location)
+        for entry in self.config.locations:
+            self.get_certificate(entry)
+
+        if self.polling and self.config.get('auto-load-certs'):
+            self.registry.load_certificates()
+
+    def open_history(self) -> History:
+        return History(history_file=self.config.get('history-file'),
+                       retention=self.config.get('history-retention'),
+                       logger=self.logger)
+
+    def record_history(self, certificates: typing.List[Certificate]):
+        history = None
+        try:
+            history = self.open_history()
+            history.record(certificates)
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"Unable to record history in {self.config.get('history-file')}: {e}")
+        finally:
+            if history is not None:
+                history.close()
+
+    def show_history(self, query: str, location: str = None, days: int = 30):
+        history = self.open_history()
+
+        match query:
+            case 'changed':
+                for loc in [location] if location is not None else history.locations():
+                    change = history.last_change(loc)
+                    if change is None:
+                        print(f'{loc}: no certificate observed')
+                    elif change[0] is None:
+                        print(f'{loc}: unchanged since first observation ({change[1]})')
+                    else:
+                        print(f'{loc}: changed at {change[0].isoformat()} ({change[1]})')
+            case 'stale':
+                for loc, hosts, not_after, newest in history.stale():
+                    print(f'{loc}: serves certificate valid until {not_after.isoformat()}, '
+                          f'newer one valid until {newest.isoformat()} exists for {hosts}')
+            case 'latency':
+                for loc, day, fetches, errors, avg, peak in history.latency(days, location):
+                    avg = f'{avg * 1000:.1f}ms' if avg is not None else '-'
+                    peak = f'{peak * 1000:.1f}ms' if peak is not None else '-'
+                    print(f'{loc} {day}: {fetches} fetches, {errors} errors, avg {avg}, max {peak}')
+
+        history.close()
+        sys.exit(0)
 
     def show_polls(self):
-        self.logger.info(self.notifier.send(['polls']))
+        self.logger.info(self.notifiers[0].send(['polls']))
         sys.exit(0)
 
     def install_cron(self):
@@ -112,12 +157,35 @@ PATH={os.path.join(os.path.dirname(os.path.realpath(__file__)), 'venv', 'bin')}
 
     def finish(self):
 
-        if isinstance(self.notifier, ChannelScript):
-            result = self.notifier.send(args.poll)
+        if self.polling:
+            result = self.notifiers[0].send(args.poll)
             self.logger.info(result)
+            return
+
+        if len(self.notifiers) == 0:
+            if not self.config.get('history-enable'):
+                self.logger.warning('No notification channels or history enabled.')
+                return
+            self.logger.info('No notification channels enabled, only recording history.')
 
-        elif isinstance(self.notifier, ChannelMail):
-            self.notifier.send()
+        self.registry.load_certificates()
+
+        failed = False
+        if len(self.notifiers) > 0:
+            # deliver to all channels at once, so a slow channel doesn't hold up the others
+            with ThreadPoolExecutor(max_workers=len(self.notifiers)) as executor:
+                futures = {notifier: executor.submit(notifier.send) for notifier in self.notifiers}
+
+            for notifier, future in futures.items():
+                if future.exception() is not None:
+                    self.logger.error(f'{type(notifier).__name__} failed to send: {future.exception()}')
+                    failed = True
+
+        if self.config.get('history-enable'):
+            self.record_history(list(self.registry.certificates.values()))
+
+        if failed:
+            sys.exit(1)
 
 parser = ArgumentParser('certnotify',
                                  description='Python program to check for certificates and notify about expirations.')
@@ -148,6 +216,15 @@ parser.add_argument('-l', '--log-level',
 parser.add_argument('--reset',
                     action='store_true',
                     help='Reset configuration to defaults')
+parser.add_argument('-H', '--history',
+                    choices=History.QUERIES,
+                    help='Query the certificate history: changed, stale or latency')
+parser.add_argument('--location',
+                    help='Limit --history to a single location')
+parser.add_argument('--days',
+                    type=int,
+                    default=30,
+                    help='Amount of days to show with --history latency')
 parser.add_argument('--cron',
                     action='store_true',
                     help='Run in cron mode, this outputs to /var/log/certnotify/')
@@ -168,6 +245,8 @@ if __name__ == "__main__":
         main.uninstall_cron()
     elif args.reset:
         main.reset()
+    elif args.history:
+        main.show_history(args.history, args.location, args.days)
 
     main.setup_channel(args.poll or args.print_polls)
 
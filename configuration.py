@@ -1,4 +1,6 @@
 import configparser
+import hashlib
+import json
 import os.path
 import string
 import typing
@@ -9,16 +11,31 @@ from os import remove, mkdir
 import logging
 
 
+##
+# A single compiled location with its effective settings
+##
+class Location(typing.NamedTuple):
+    location: str
+    section: str | None
+    poll_mode: str
+    max_age: int
+    cert_file: str
+    message_template: str
+
+
 class Configuration:
     SECTIONS = {
-        'general': ['check-interval', 'auto-load-certs'],
+        'general': ['check-interval', 'auto-load-certs', 'max-workers'],
         'certificates': ['poll-mode', 'locations', 'max-age', 'cert-file', 'message-template'],
-        'mail': ['mail-enable', 'sender', 'receiver', 'smtp-server', 'smtp-port', 'smtp-security', 'smtp-user', 'smtp-password']
+        'mail': ['mail-enable', 'sender', 'receiver', 'smtp-server', 'smtp-port', 'smtp-security', 'smtp-user', 'smtp-password'],
+        'json': ['json-enable', 'json-file'],
+        'history': ['history-enable', 'history-file', 'history-retention']
     }  # section: [list of options]
 
     DEFAULTS = {
         'check-interval': ('40 6 * * *', str),
         'auto-load-certs': ('True', bool),
+        'max-workers': ('8', int),
         'poll-mode': ('host', str),
         'locations': ('', list),
         'max-age': ('32', int),
@@ -31,9 +48,19 @@ class Configuration:
         'smtp-port': ('587', int),
         'smtp-security': ('STARTTLS', str),
         'smtp-user': ('', str),
-        'smtp-password': ('', str)
+        'smtp-password': ('', str),
+        'json-enable': ('False', bool),
+        'json-file': ('~/.local/state/certnotify/notifications.jsonl', str),
+        'history-enable': ('True', bool),
+        'history-file': ('~/.local/state/certnotify/history.sqlite', str),
+        'history-retention': ('365', int)
     }  # option: default value
 
+    POLL_MODES = ['host', 'files']
+
+    SNAPSHOT_VERSION = 1
+    SNAPSHOT_DIR = '~/.cache/certnotify'
+
     COMMENTS = {
         'check-interval': """
 # Cron expression for the check interval.
@@ -43,6 +70,9 @@ class Configuration:
 # Should the programme automatically load the certificate data?
 # Useful for the script polling mode
 # Default: True""",
+        'max-workers': """
+# Maximum number of certificates fetched at the same time.
+# Default: 8""",
         'poll-mode': """
 # Determines what mode to use in general.
 # this option can be overridden per location in optional [units]
@@ -85,7 +115,23 @@ class Configuration:
         'smtp-security': """
 # What type of security should be established with the SMTP server?
 # PLAIN: no security, TLS, STARTTLS
-# Default: STARTTLS"""
+# Default: STARTTLS""",
+        'json-enable': """
+# Enable writing notifications as JSON lines to a file?
+# Default: False""",
+        'json-file': """
+# File to append the JSON notifications to.
+# Default: ~/.local/state/certnotify/notifications.jsonl""",
+        'history-enable': """
+# Keep a history of every observed certificate?
+# Query it with --history
+# Default: True""",
+        'history-file': """
+# SQLite database to store the history in.
+# Default: ~/.local/state/certnotify/history.sqlite""",
+        'history-retention': """
+# The amount of days observations are kept in the history. 0 keeps them forever.
+# Default: 365"""
     }
 
     def __init__(self, config_file: string, logger: logging.Logger):
@@ -93,6 +139,11 @@ class Configuration:
         self.config = configparser.ConfigParser(allow_no_value=True)
         self.logger: logging.Logger = logger
         self.config_values = {}
+        self.locations: typing.List[Location] = []
+        self.errors: typing.List[str] = []
+        self.snapshot_file = os.path.join(
+            os.path.expanduser(Configuration.SNAPSHOT_DIR),
+            hashlib.sha256(os.path.realpath(self.config_file).encode()).hexdigest()[:16] + '.json')
 
     ##
     # Resets the config file.
@@ -133,6 +184,7 @@ class Configuration:
 
     ##
     # Config reader
+    # Uses the cached snapshot if the config file is unchanged, otherwise parses and compiles it.
     # Returns config values in a dict
     ##
     def read_config(self):
@@ -140,13 +192,140 @@ class Configuration:
             self.logger.warning(f'Config file not found at {self.config_file}, creating from defaults.')
             self.create_config()
 
-        self.config.read(self.config_file)
+        stat = os.stat(self.config_file)
+        snapshot = self.__read_snapshot()
+        if snapshot is not None and snapshot['mtime'] == stat.st_mtime_ns and snapshot['size'] == stat.st_size:
+            self.__load_snapshot(snapshot)
+            return self.config_values
+
+        with open(self.config_file, 'rb') as conf:
+            content = conf.read()
+        digest = hashlib.sha256(content).hexdigest()
 
-        self.__get_sections()
-        self.__get_extra_sections()
+        if snapshot is not None and snapshot['hash'] == digest:
+            self.__load_snapshot(snapshot)
+        else:
+            self.config.read_string(content.decode(), source=self.config_file)
+            self.__get_sections()
+            self.__get_extra_sections()
+            self.compile_config()
+
+        self.__write_snapshot(stat, digest)
 
         return self.config_values
 
+    ##
+    # Resolves all locations into a flat table of Location entries with their effective settings.
+    # Every problem is collected in self.errors instead of stopping at the first one.
+    ##
+    def compile_config(self):
+        self.locations = []
+        seen = set()
+
+        locations = [loc for loc in self.config_values['locations'] if loc != '']
+        if len(locations) == 0:
+            self.errors.append('No locations configured')
+
+        for location in locations:
+            if not location.startswith('section:'):
+                self.__add_location(location, None, seen)
+                continue
+
+            section = location.replace('section:', '', 1)
+            if section in Configuration.SECTIONS.keys() or not isinstance(self.config_values.get(section), dict):
+                self.errors.append(f"Section [{section}] referenced in locations does not exist")
+                continue
+
+            sub_locations = [loc for loc in (self.config_values[section]['locations'] or []) if loc != '']
+            if len(sub_locations) == 0:
+                self.errors.append(f"No location specified for [{section}]")
+                continue
+
+            for sub_location in sub_locations:
+                if sub_location.startswith('section:'):
+                    self.errors.append(f"Nested section reference '{sub_location}' in [{section}] is not supported")
+                    continue
+                self.__add_location(sub_location, section, seen)
+
+        return self.locations
+
+    def __add_location(self, location: str, section: str | None, seen: set):
+        if (location, section) in seen:
+            self.logger.debug(f"Skipping duplicate location '{location}'.")
+            return
+        seen.add((location, section))
+
+        values = self.config_values if section is None else self.config_values[section]
+        self.locations.append(Location(location=location,
+                                       section=section,
+                                       poll_mode=values['poll-mode'],
+                                       max_age=values['max-age'],
+                                       cert_file=values['cert-file'],
+                                       message_template=values['message-template']))
+
+    ##
+    # Logs every configuration error
+    # Returns True if the configuration is valid
+    ##
+    def validate(self) -> bool:
+        for error in self.errors:
+            self.logger.error(error)
+        return len(self.errors) == 0
+
+    def __read_snapshot(self) -> dict | None:
+        if not path_exists(self.snapshot_file):
+            return None
+        try:
+            with open(self.snapshot_file, 'rt') as snap:
+                snapshot = json.load(snap)
+        except (OSError, ValueError):
+            self.logger.debug(f'Unable to read config snapshot {self.snapshot_file}, ignoring it.')
+            return None
+
+        if (snapshot.get('version') != Configuration.SNAPSHOT_VERSION
+                or snapshot.get('schema') != Configuration.__schema_hash()
+                or snapshot.get('config') != self.config_file):
+            return None
+        return snapshot
+
+    ##
+    # Hash of the known sections and options, a snapshot written with different options is never used
+    ##
+    @staticmethod
+    def __schema_hash() -> str:
+        schema = [Configuration.SECTIONS, {opt: [value, class_type.__name__] for opt, (value, class_type) in Configuration.DEFAULTS.items()}]
+        return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+    def __load_snapshot(self, snapshot: dict):
+        self.logger.debug(f'Using config snapshot {self.snapshot_file}')
+        self.config_values = snapshot['values']
+        self.locations = [Location(**loc) for loc in snapshot['locations']]
+        self.errors = snapshot['errors']
+
+    def __write_snapshot(self, stat: os.stat_result, digest: str):
+        snapshot = {
+            'version': Configuration.SNAPSHOT_VERSION,
+            'schema': Configuration.__schema_hash(),
+            'config': self.config_file,
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': digest,
+            'values': self.config_values,
+            'locations': [loc._asdict() for loc in self.locations],
+            'errors': self.errors
+        }
+
+        try:
+            os.makedirs(dirname(self.snapshot_file), mode=0o700, exist_ok=True)
+            tmp_file = f'{self.snapshot_file}.{os.getpid()}.tmp'
+            if path_exists(tmp_file):
+                remove(tmp_file)
+            with os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wt') as snap:
+                json.dump(snapshot, snap)
+            os.replace(tmp_file, self.snapshot_file)
+        except OSError as e:
+            self.logger.warning(f'Unable to write config snapshot {self.snapshot_file}: {e}')
+
     def __get_sections(self):
         for sec, opts in Configuration.SECTIONS.items():
             if not self.config.has_section(sec):
@@ -158,6 +337,8 @@ class Configuration:
             for opt in opts:
                 self.config_values[opt] = self.__get_option(section=sec, option=opt, fallback=Configuration.DEFAULTS[opt][0], class_type=Configuration.DEFAULTS[opt][1])
 
+        self.__check_poll_mode('certificates', self.config_values['poll-mode'])
+
     def __get_extra_sections(self):
         # Get the extra custom values
         if len(self.config.sections()) > len(Configuration.SECTIONS):
@@ -167,13 +348,19 @@ class Configuration:
                 self.logger.info(f"Section '{sec}' found.")
                 section = {}
                 for opt in Configuration.SECTIONS['certificates']:
-                    if Configuration.DEFAULTS[opt] == '':
+                    if Configuration.DEFAULTS[opt][0] == '':
                         section[opt] = self.__get_option(section=sec, option=opt, fallback=None, class_type=Configuration.DEFAULTS[opt][1])
                     else:
                         section[opt] = self.__get_option(section=sec, option=opt, fallback=self.config_values[opt], class_type=Configuration.DEFAULTS[opt][1])
                     self.logger.debug(f"Option '{opt}' set to '{section[opt]}'.")
+                self.__check_poll_mode(sec, section['poll-mode'])
                 self.config_values[sec] = section
 
+    def __check_poll_mode(self, section: str, poll_mode: str):
+        if poll_mode not in Configuration.POLL_MODES:
+            self.errors.append(f"Invalid poll-mode '{poll_mode}' in [{section}], "
+                               f"choose from {', '.join(Configuration.POLL_MODES)}")
+
     ##
     # Option value getter which returns in the correct variable type
     # Returns option value or fallback
@@ -185,26 +372,27 @@ class Configuration:
         elif fallback is not None:
             fallback = fallback == "True"
 
-        if class_type == str:
-            value = self.config.get(section=section, option=option, fallback=None)
+        try:
+            if class_type == str:
+                value = self.config.get(section=section, option=option, fallback=None)
 
-        elif class_type == int:
-            value = self.config.getint(section=section, option=option, fallback=None)
+            elif class_type == int:
+                value = self.config.getint(section=section, option=option, fallback=None)
 
-        elif class_type == float:
-            value = self.config.getfloat(section=section, option=option, fallback=None)
+            elif class_type == float:
+                value = self.config.getfloat(section=section, option=option, fallback=None)
 
-        elif class_type == bool:
-            value = self.config.getboolean(section=section, option=option, fallback=None)
+            elif class_type == bool:
+                value = self.config.getboolean(section=section, option=option, fallback=None)
 
-        elif class_type == list:
-            value = self.config.get(section=section, option=option, fallback=None)
-            if value is not None:
-                value = value.split(',')
-                for v in value:
-                    i = value.index(v)
-                    value[i] = v.strip()
+            elif class_type == list:
+                value = self.config.get(section=section, option=option, fallback=None)
+                if value is not None:
+                    value = [v.strip() for v in value.split(',')]
 
+        except ValueError:
+            self.errors.append(f"Invalid value '{self.config.get(section=section, option=option)}' "
+                               f"for '{option}' in [{section}], expected {class_type.__name__}")
 
         if value is None and fallback is not None and fallback != '':
             if section in Configuration.SECTIONS.keys():
@@ -0,0 +1,162 @@
+import logging
+import os
+import sqlite3
+import typing
+from datetime import datetime, UTC, timedelta
+
+from certificate import Certificate
+from cryptography import x509
+
+
+class History:
+    QUERIES = ['changed', 'stale', 'latency']
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS observations (
+            observed_at INTEGER NOT NULL,
+            location TEXT NOT NULL,
+            fingerprint TEXT,
+            hosts TEXT,
+            not_after INTEGER,
+            latency REAL,
+            error TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_location_time ON observations (location, observed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_location_fingerprint ON observations (location, fingerprint, observed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_time ON observations (observed_at)",
+        """CREATE TABLE IF NOT EXISTS latest (
+            location TEXT PRIMARY KEY,
+            seen_at INTEGER NOT NULL,
+            fingerprint TEXT,
+            hosts TEXT,
+            not_after INTEGER
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_latest_hosts ON latest (hosts, not_after)"
+    ]
+
+    def __init__(self, history_file: str, retention: int, logger: logging.Logger):
+        self.history_file: str = os.path.expanduser(history_file)
+        self.retention: int = retention
+        self.logger: logging.Logger = logger
+
+        if os.path.dirname(self.history_file) != '':
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+        self.db = sqlite3.connect(self.history_file)
+        # auto_vacuum only applies to a new database, an existing one is converted once with VACUUM
+        self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if self.db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.db.execute("VACUUM")
+        with self.db:
+            for statement in History.SCHEMA:
+                self.db.execute(statement)
+
+    def close(self):
+        self.db.close()
+
+    ##
+    # Appends an observation for every certificate in one transaction and drops observations older than the retention.
+    # Observations are keyed by the location as configured.
+    # The latest table keeps the last successful observation of every location in this run,
+    # locations which are no longer configured are removed from it.
+    ##
+    def record(self, certificates: typing.List[Certificate]):
+        now = datetime.now(UTC)
+        seen_at = int(now.timestamp())
+        rows = [self.__observation(seen_at, cert) for cert in certificates]
+
+        with self.db:
+            self.db.executemany("INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany("""INSERT INTO latest VALUES (?, ?, ?, ?, ?)
+                                   ON CONFLICT (location) DO UPDATE SET seen_at = excluded.seen_at,
+                                       fingerprint = excluded.fingerprint, hosts = excluded.hosts,
+                                       not_after = excluded.not_after""",
+                                [(row[1], row[0], row[2], row[3], row[4]) for row in rows if row[2] is not None])
+            self.db.executemany("""INSERT INTO latest (location, seen_at) VALUES (?, ?)
+                                   ON CONFLICT (location) DO UPDATE SET seen_at = excluded.seen_at""",
+                                [(row[1], row[0]) for row in rows if row[2] is None])
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS current (location TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM current")
+            self.db.executemany("INSERT OR IGNORE INTO current VALUES (?)", [(row[1],) for row in rows])
+            self.db.execute("DELETE FROM latest WHERE location NOT IN (SELECT location FROM current)")
+            if self.retention > 0:
+                self.db.execute("DELETE FROM observations WHERE observed_at < ?",
+                                (int((now - timedelta(days=self.retention)).timestamp()),))
+
+        # give the space of deleted observations back to the file system,
+        # executescript steps the pragma until every free page is released
+        self.db.executescript("PRAGMA incremental_vacuum;")
+
+        self.logger.debug(f'Recorded {len(rows)} observation(s) in {self.history_file}')
+
+    @staticmethod
+    def __observation(observed_at: int, cert: Certificate) -> tuple:
+        if cert.data is None:
+            return observed_at, cert.entry.location, None, None, None, cert.latency, cert.error
+
+        try:
+            hosts = ','.join(sorted(cert.get_hosts()))
+        except x509.ExtensionNotFound:
+            hosts = None
+
+        return (observed_at, cert.entry.location, cert.fingerprint(), hosts,
+                int(cert.data.not_valid_after_utc.timestamp()), cert.latency, cert.error)
+
+    def locations(self) -> typing.List[str]:
+        return [row[0] for row in self.db.execute("SELECT DISTINCT location FROM observations ORDER BY location")]
+
+    ##
+    # When did the certificate served at location last change?
+    # Returns (changed_at, fingerprint) or None if nothing was observed.
+    # changed_at is None if the certificate never changed during the retention.
+    ##
+    def last_change(self, location: str) -> typing.Tuple[datetime | None, str] | None:
+        row = self.db.execute("""SELECT fingerprint FROM observations
+                                 WHERE location = ? AND fingerprint IS NOT NULL
+                                 ORDER BY observed_at DESC LIMIT 1""", (location,)).fetchone()
+        if row is None:
+            return None
+        fingerprint = row[0]
+
+        previous = self.db.execute("""SELECT MAX(observed_at) FROM observations
+                                      WHERE location = ? AND fingerprint IS NOT NULL AND fingerprint != ?""",
+                                   (location, fingerprint)).fetchone()[0]
+        if previous is None:
+            return None, fingerprint
+
+        changed_at = self.db.execute("""SELECT MIN(observed_at) FROM observations
+                                        WHERE location = ? AND fingerprint = ? AND observed_at > ?""",
+                                     (location, fingerprint, previous)).fetchone()[0]
+        return datetime.fromtimestamp(changed_at, UTC), fingerprint
+
+    ##
+    # Which locations still serve an older certificate than another location with the same hosts?
+    # e.g. renewed on disk, but the old certificate is still served by the host.
+    # Returns [(location, hosts, not_after, newest_not_after)]
+    ##
+    def stale(self) -> typing.List[typing.Tuple[str, str, datetime, datetime]]:
+        rows = self.db.execute("""SELECT latest.location, latest.hosts, latest.not_after, newest.not_after
+                                  FROM latest JOIN (
+                                      SELECT hosts, MAX(not_after) AS not_after FROM latest
+                                      WHERE hosts IS NOT NULL GROUP BY hosts
+                                  ) AS newest ON latest.hosts = newest.hosts
+                                  WHERE latest.not_after < newest.not_after
+                                  ORDER BY latest.location""")
+        return [(location, hosts, datetime.fromtimestamp(not_after, UTC), datetime.fromtimestamp(newest, UTC))
+                for location, hosts, not_after, newest in rows]
+
+    ##
+    # Daily fetch latency per location over the last days
+    # Returns [(location, day, fetches, errors, avg_latency, max_latency)]
+    ##
+    def latency(self, days: int, location: str = None) -> typing.List[typing.Tuple[str, str, int, int, float, float]]:
+        since = int((datetime.now(UTC) - timedelta(days=days)).timestamp())
+        query = """SELECT location, date(observed_at, 'unixepoch') AS day, COUNT(*), COUNT(error),
+                          AVG(latency), MAX(latency)
+                   FROM observations WHERE observed_at >= ?"""
+        params = [since]
+        if location is not None:
+            query += " AND location = ?"
+            params.append(location)
+        query += " GROUP BY location, day ORDER BY location, day"
+
+        return self.db.execute(query, params).fetchall()
@@ -3,12 +3,13 @@ import typing
 from abc import ABC, abstractmethod
 
 from certificate import Certificate
+from notification.registry import CertificateRegistry
 
 
 class NotificationChannel(ABC):
 
-    def __init__(self, logger: logging.Logger):
-        self.certificates: typing.Dict[str, Certificate] = {}
+    def __init__(self, logger: logging.Logger, registry: CertificateRegistry):
+        self.registry: CertificateRegistry = registry
         self.logger: logging.Logger = logger
 
     ##
@@ -18,28 +19,9 @@ class NotificationChannel(ABC):
     def send(self, params: typing.List[str] = None) -> typing.Any:
         pass
 
-    def register_certificate(self, cert: Certificate):
-        self.certificates[cert.location.replace('.', '_')] = cert
+    @property
+    def certificates(self) -> typing.Dict[str, Certificate]:
+        return self.registry.certificates
 
     def get_certificate(self, ident: str) -> Certificate:
-        return self.certificates[ident] if ident in self.certificates.keys() else None
-
-    def has_certificate(self, cert: Certificate):
-        for c in self.certificates.values():
-            if c == cert:
-                return True
-
-        return False
-
-
-    def prune_certificates(self):
-        for key, cert in self.certificates.copy().items():
-            for k, c in self.certificates.items():
-                if k == key:
-                    continue
-                elif c == cert:
-                    self.logger.debug(f"Pruning {k} from registry, it's the same certificate as {key}")
-                    self.certificates.pop(k) # keep first occurance
-                    self.prune_certificates()
-                    return
-
+        return self.registry.get_certificate(ident)
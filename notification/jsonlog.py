@@ -0,0 +1,43 @@
+import json
+import logging
+import os
+import typing
+from abc import ABC
+from datetime import datetime, UTC
+
+from notification.channel import NotificationChannel
+from notification.registry import CertificateRegistry
+
+
+class ChannelJson(NotificationChannel, ABC):
+    def __init__(self, logger: logging.Logger, registry: CertificateRegistry, json_file: str):
+        super().__init__(logger, registry)
+        self.json_file: str = os.path.expanduser(json_file)
+
+    ##
+    # Appends one JSON line per certificate that should be warned about
+    ##
+    def send(self, params: typing.List[str] = None) -> typing.Any:
+        now = datetime.now(UTC).isoformat()
+        lines = []
+        for cert in self.registry.loaded_certificates():
+            if not cert.should_warn():
+                continue
+            lines.append(json.dumps({
+                'time': now,
+                'location': cert.location,
+                'valid_days': cert.expiry.days,
+                'not_after': cert.data.not_valid_after_utc.isoformat(),
+                'max_age': cert.max_age,
+                'alts': cert.get_hosts(),
+                'message': cert.get_message()
+            }))
+
+        if len(lines) == 0:
+            return
+
+        if os.path.dirname(self.json_file) != '':
+            os.makedirs(os.path.dirname(self.json_file), exist_ok=True)
+        with open(self.json_file, 'at') as out:
+            out.write('\n'.join(lines) + '\n')
+        self.logger.info(f'Wrote {len(lines)} notification(s) to {self.json_file}')
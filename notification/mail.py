@@ -7,12 +7,13 @@ from email.message import EmailMessage
 from smtplib import SMTPNotSupportedError, SMTPAuthenticationError, SMTPException
 
 from notification.channel import NotificationChannel
+from notification.registry import CertificateRegistry
 import smtplib
 
 class ChannelMail(NotificationChannel, ABC):
-    def __init__(self, logger: logging.Logger, smtp_server: str, smtp_port: int, smtp_security: str, smtp_user: str, smtp_password: str, sender: str,
-                 receiver: str):
-        super().__init__(logger)
+    def __init__(self, logger: logging.Logger, registry: CertificateRegistry, smtp_server: str, smtp_port: int, smtp_security: str, smtp_user: str,
+                 smtp_password: str, sender: str, receiver: str):
+        super().__init__(logger, registry)
 
         if not all([smtp_server, smtp_port, smtp_user, smtp_password, sender, receiver]):
             self.logger.error("No SMTP server properly configured. Exiting.")
@@ -20,45 +21,58 @@ class ChannelMail(NotificationChannel, ABC):
 
         self.sender: str = sender
         self.receiver: str = receiver
+        self.host: str = smtp_server
+        self.port: int = smtp_port
+        self.security: str = smtp_security
+        self.user: str = smtp_user
+        self.password: str = smtp_password
 
-        match smtp_security.upper():
-            case "STARTTLS":
-                self.smtp_server: smtplib.SMTP = smtplib.SMTP(host=smtp_server, port=smtp_port)
-                self.__debuglog_command(self.smtp_server.starttls())
-            case "TLS":
-                self.smtp_server: smtplib.SMTP = smtplib.SMTP_SSL(host=smtp_server, port=smtp_port)
-            case "PLAIN":
-                self.smtp_server: smtplib.SMTP = smtplib.SMTP(host=smtp_server, port=smtp_port)
-            case _:
-                self.smtp_server: smtplib.SMTP = smtplib.SMTP(host=smtp_server, port=smtp_port)
-
+    ##
+    # Connect and log in to the SMTP server
+    # Returns the connection, raises on failure after closing it
+    ##
+    def __connect(self) -> smtplib.SMTP:
+        smtp_server: smtplib.SMTP | None = None
         try:
-            self.__debuglog_command(self.smtp_server.login(smtp_user, smtp_password))
-        except SMTPNotSupportedError:
-            self.logger.error('SMTP server does not support AUTH command.')
-            sys.exit(1)
-        except SMTPAuthenticationError:
-            self.logger.error('Provided user/password combination invalid for SMTP server.')
-            sys.exit(1)
-        except SMTPException:
-            self.logger.error('No suitable authentication method was found for the SMTP server.')
-            sys.exit(1)
+            match self.security.upper():
+                case "STARTTLS":
+                    smtp_server = smtplib.SMTP(host=self.host, port=self.port)
+                    self.__debuglog_command(smtp_server.starttls())
+                case "TLS":
+                    smtp_server = smtplib.SMTP_SSL(host=self.host, port=self.port)
+                case "PLAIN":
+                    smtp_server = smtplib.SMTP(host=self.host, port=self.port)
+                case _:
+                    smtp_server = smtplib.SMTP(host=self.host, port=self.port)
 
-    def send(self, params: typing.List[str] = None) -> typing.Any:
-        self.prune_certificates()
+            self.__debuglog_command(smtp_server.login(self.user, self.password))
+            return smtp_server
+        except Exception as e:
+            if smtp_server is not None:
+                smtp_server.close()
+
+            if isinstance(e, SMTPNotSupportedError):
+                self.logger.error('SMTP server does not support AUTH command.')
+            elif isinstance(e, SMTPAuthenticationError):
+                self.logger.error('Provided user/password combination invalid for SMTP server.')
+            else:
+                self.logger.error(f'Unable to connect to SMTP server {self.host}:{self.port}: {e}')
+            raise
 
-        for cert in self.certificates.values():
-            if cert.data is None:
-                cert.load_cert_data()
+    def send(self, params: typing.List[str] = None) -> typing.Any:
+        messages = [cert.get_message() for cert in self.registry.unique_certificates() if cert.should_warn()]
+        if len(messages) == 0:
+            return
 
-            if cert.should_warn():
+        with self.__connect() as smtp_server:
+            for message in messages:
                 msg = EmailMessage()
-                msg.set_content(cert.get_message())
+                msg.set_content(message)
                 msg['Subject'] = 'Certificate expiry'
                 msg['From'] = self.sender
                 msg['To'] = self.receiver
-                self.smtp_server.send_message(msg)
+                smtp_server.send_message(msg)
                 self.logger.info(f'Send mail to {self.receiver}')
 
     def __debuglog_command(self, command: typing.Tuple[int, bytes]):
-        self.logger.debug(f'Code {str(command[0])} - {command[1].decode()}')
\ No newline at end of file
+        self.logger.debug(f'Code {str(command[0])} - {command[1].decode()}')
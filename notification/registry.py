@@ -0,0 +1,70 @@
+import logging
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from certificate import Certificate
+
+
+class CertificateRegistry:
+
+    def __init__(self, logger: logging.Logger, max_workers: int = 8):
+        self.certificates: typing.Dict[str, Certificate] = {}
+        self.errors: typing.Dict[str, str] = {}
+        self.logger: logging.Logger = logger
+        self.max_workers: int = max(1, max_workers)
+
+    def register_certificate(self, cert: Certificate):
+        self.certificates[cert.location.replace('.', '_')] = cert
+
+    def get_certificate(self, ident: str) -> Certificate:
+        return self.certificates[ident] if ident in self.certificates.keys() else None
+
+    def has_certificate(self, cert: Certificate):
+        for c in self.certificates.values():
+            if c == cert:
+                return True
+
+        return False
+
+    ##
+    # Fetch and parse every certificate which isn't loaded yet, concurrently.
+    # Failures are logged and kept in self.errors, so each certificate is only attempted once.
+    ##
+    def load_certificates(self):
+        pending = {key: cert for key, cert in self.certificates.items()
+                   if cert.data is None and key not in self.errors}
+        if len(pending) == 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+            futures = {key: executor.submit(cert.load_cert_data) for key, cert in pending.items()}
+
+        for key, future in futures.items():
+            if future.exception() is not None:
+                self.errors[key] = str(future.exception())
+                pending[key].error = str(future.exception())
+                self.logger.error(f'Unable to load certificate for {pending[key].location}: {future.exception()}')
+
+    ##
+    # Returns all certificates which have been loaded successfully
+    ##
+    def loaded_certificates(self) -> typing.List[Certificate]:
+        return [cert for cert in self.certificates.values() if cert.data is not None]
+
+    ##
+    # Returns the loaded certificates, skipping locations which serve the same certificate as an earlier one.
+    # The registry itself is left untouched.
+    ##
+    def unique_certificates(self) -> typing.List[Certificate]:
+        unique: typing.List[Certificate] = []
+        for key, cert in self.certificates.items():
+            if cert.data is None:
+                continue
+            for c in unique:
+                if c == cert:
+                    self.logger.debug(f"Skipping {key}, it's the same certificate as {c.location}")
+                    break
+            else:
+                unique.append(cert)
+
+        return unique